@@ -3,11 +3,17 @@ Coded Tool wrapper for MCP Quote Generator
 This tool interfaces with the MCP server to generate insurance quotes
 """
 
+import asyncio
+import functools
 import json
 import logging
 import os
+import re
+import threading
+import weakref
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
 
 from neuro_san.interfaces.coded_tool import CodedTool
 
@@ -20,6 +26,141 @@ DEFAULT_DEDUCTIBLE = 1000
 DEFAULT_POLICY_TERM_DAYS = 365
 RISK_TYPE = "General Business Risk"
 LOCATION_REFERENCE = "LOC-001"
+MCP_SERVER_NAME = "create-quote"
+# An MCP session that has not been used for this long is closed, stopping its MCP server process
+MCP_SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT_SECONDS", "300"))
+
+# Currency symbols, thousands separators and whitespace stripped from monetary amounts
+_AMOUNT_RE = re.compile(r"[$,\s]")
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_amount_str(value: str, default: int) -> int:
+    """Parse a monetary amount string such as "$1,000,000"."""
+    return int(_AMOUNT_RE.sub("", value) or default)
+
+
+class McpSession:
+    """
+    One MCP session, and so one MCP server process, shared by the quote calls made on one event loop.
+
+    neuro-san creates a new CodedTool instance for every call, so the session is kept at module level
+    by _get_mcp_session(). It is held open by its own task: the stdio client's context has to be entered
+    and exited by the same task. The session closes, stopping the server process, when it has been idle
+    for MCP_SESSION_IDLE_TIMEOUT_SECONDS, when close() is called (as it is after a failed call), or when
+    its task is cancelled as the event loop shuts down.
+    """
+
+    def __init__(self, server_path: str):
+        """
+        :param server_path: Path of the MCP server script run with node
+        """
+        # Quote creation tool, looked up once per session
+        self.quote_tool = None
+        self.active_calls = 0
+
+        loop = asyncio.get_running_loop()
+        self.last_used = loop.time()
+        # Set once the session is closing: new calls then open a new session
+        self._close_event = asyncio.Event()
+        self._tools_ready: asyncio.Future = loop.create_future()
+        self.task = loop.create_task(self._run(server_path))
+
+    @property
+    def usable(self) -> bool:
+        """Whether new calls may still use this session."""
+        return not self._close_event.is_set() and not self.task.done()
+
+    def acquire(self):
+        """Mark the start of a call using this session, keeping it from closing while idle."""
+        self.active_calls += 1
+        self.last_used = asyncio.get_running_loop().time()
+
+    def release(self):
+        """Mark the end of a call using this session."""
+        self.active_calls -= 1
+        self.last_used = asyncio.get_running_loop().time()
+
+    async def get_tools(self) -> List[Any]:
+        """Return the MCP server tools, waiting for the session to connect if needed."""
+        # Shielded: a cancelled caller must not cancel the future other callers are waiting on
+        return await asyncio.shield(self._tools_ready)
+
+    def close(self):
+        """Close the session, stopping the MCP server process. Calls still using it fail."""
+        self._close_event.set()
+
+    async def _run(self, server_path: str):
+        """Open the session, publish its tools, and keep it open until it is closed."""
+        try:
+            from langchain_mcp_adapters.client import MultiServerMCPClient
+            from langchain_mcp_adapters.tools import load_mcp_tools
+
+            client = MultiServerMCPClient(
+                {
+                    MCP_SERVER_NAME: {
+                        "transport": "stdio",
+                        "command": "node",
+                        "args": [server_path],
+                        "env": {}
+                    }
+                }
+            )
+
+            logger.info("Connecting to MCP server...")
+            async with client.session(MCP_SERVER_NAME) as session:
+                self._tools_ready.set_result(await load_mcp_tools(session))
+                await self._wait_until_closing()
+            logger.info("Closed MCP session")
+
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Reported to the callers waiting for the tools, or logged once they have them
+            if not self._tools_ready.done():
+                self._tools_ready.set_exception(e)
+            else:
+                logger.error(f"MCP session closed unexpectedly: {str(e)}", exc_info=True)
+
+        finally:
+            self._close_event.set()
+            if not self._tools_ready.done():
+                self._tools_ready.set_exception(RuntimeError("MCP session closed before its tools were loaded"))
+
+    async def _wait_until_closing(self):
+        """Wait until close() is called or the session has had no calls for MCP_SESSION_IDLE_TIMEOUT_SECONDS."""
+        loop = asyncio.get_running_loop()
+        while True:
+            remaining = MCP_SESSION_IDLE_TIMEOUT_SECONDS - (loop.time() - self.last_used)
+            if self.active_calls == 0 and remaining <= 0:
+                # Set before any await, so no new call can pick up this session any more
+                self._close_event.set()
+                logger.info("Closing idle MCP session")
+                return
+            try:
+                await asyncio.wait_for(
+                    self._close_event.wait(),
+                    timeout=remaining if remaining > 0 else MCP_SESSION_IDLE_TIMEOUT_SECONDS
+                )
+                return
+            except asyncio.TimeoutError:
+                pass
+
+
+# Open MCP sessions, keyed by (server path, event loop). Weak values: a session whose event loop
+# was discarded without cancelling its task is dropped together with the loop.
+_mcp_sessions: "weakref.WeakValueDictionary[Tuple[str, asyncio.AbstractEventLoop], McpSession]" = \
+    weakref.WeakValueDictionary()
+_mcp_sessions_lock = threading.Lock()
+
+
+def _get_mcp_session(server_path: str) -> McpSession:
+    """Return the MCP session for the server on the running event loop, opening it if needed."""
+    key = (server_path, asyncio.get_running_loop())
+    with _mcp_sessions_lock:
+        session = _mcp_sessions.get(key)
+        if session is None or not session.usable:
+            session = McpSession(server_path)
+            _mcp_sessions[key] = session
+        return session
 
 
 class McpQuoteGenerator(CodedTool):
@@ -37,108 +178,128 @@ class McpQuoteGenerator(CodedTool):
     @staticmethod
     def _parse_amount(value: Any, default: int = 1000000) -> int:
         """Parse monetary amount from various input formats."""
-        if isinstance(value, int):
+        # Exact type check first: ints are by far the most common input
+        if type(value) is int:  # pylint: disable=unidiomatic-typecheck
             return value
+        if isinstance(value, (int, float, Decimal)):
+            return int(value)
         if isinstance(value, str):
-            return int(value.replace("$", "").replace(",", ""))
+            return _parse_amount_str(value, default)
         return default
 
-    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> str:
-        """Generate insurance quote using MCP server."""
-        logger.info("MCP Quote Generator tool invoked!")
-        
-        try:
-            from langchain_mcp_adapters.client import MultiServerMCPClient
-            
-            # Validate required parameters
-            required_params = ["business_type", "coverage_type", "coverage_limit", "location"]
-            missing_params = [param for param in required_params if not args.get(param)]
-            
-            if missing_params:
-                error_msg = f"❌ Error: Missing required parameters: {', '.join(missing_params)}"
-                logger.error(error_msg)
-                return error_msg
+    @classmethod
+    def _build_quote_request(cls, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the MCP quote request from the tool arguments."""
+        # Parse each amount and read the clock once, reusing the values wherever they appear
+        coverage_limit = cls._parse_amount(args.get("coverage_limit"))
+        deductible = cls._parse_amount(args.get("deductible"), DEFAULT_DEDUCTIBLE)
+        now = datetime.now()
+        created_date = now.strftime("%Y-%m-%d")
+        expiration_date = (now + timedelta(days=DEFAULT_POLICY_TERM_DAYS)).strftime("%Y-%m-%d")
 
-            # Create MCP client connection
-            client = MultiServerMCPClient(
-                {
-                    "create-quote": {
-                        "transport": "stdio",
-                        "command": "node",
-                        "args": [self.mcp_server_path],
-                        "env": {}
+        return {
+            "quote": {
+                "created_date": created_date,
+                "expiration_date": expiration_date,
+                "quote_status": "Active",
+                "locations": [
+                    {
+                        "address": args.get("location", "Unknown Location"),
+                        "property_type": args.get("business_type", "Commercial Building"),
+                        "square_footage": int(args.get("square_footage", DEFAULT_SQUARE_FOOTAGE))
                     }
-                }
-            )
-            
-            logger.info("Connecting to MCP server...")
-            tools = await client.get_tools()
-            
+                ],
+                "lines": [
+                    {
+                        "line_type": args.get("coverage_type", "Property Insurance"),
+                        "policy_limit": coverage_limit,
+                        "deductible": deductible,
+                        "risks": [
+                            {
+                                "risk_type": RISK_TYPE,
+                                "location_reference": LOCATION_REFERENCE,
+                                "risk_description": f"{args.get('coverage_type', 'Property')} risk for {args.get('business_type', 'business')} operation",
+                                "coverages": [
+                                    {
+                                        "coverage_type": args.get("coverage_type", "Property"),
+                                        "coverage_limit": coverage_limit
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        }
+
+    async def _generate_quote(self, session: McpSession, args: Dict[str, Any],
+                              quote_request: Dict[str, Any]) -> str:
+        """Generate a quote with the quote creation tool of the MCP session."""
+        quote_tool = session.quote_tool
+        if quote_tool is None:
+            tools = await session.get_tools()
+
             if not tools:
-                return "❌ Error: Quote generation service is not available. Please ensure the MCP server is running."
+                return ("❌ Error: Quote generation service is not available. "
+                        "Please ensure the MCP server is running.")
 
             # Find the quote creation tool
             quote_tool = next(
                 (tool for tool in tools if "quote" in tool.name.lower() and "create" in tool.name.lower()),
                 None
             )
-            
+
             if not quote_tool:
                 available_tools = ", ".join([t.name for t in tools])
-                return f"❌ Error: Quote creation tool not found in MCP server. Available tools: {available_tools}"
+                return ("❌ Error: Quote creation tool not found in MCP server. "
+                        f"Available tools: {available_tools}")
 
-            # Prepare quote request
-            created_date = datetime.now().strftime("%Y-%m-%d")
-            expiration_date = (datetime.now() + timedelta(days=DEFAULT_POLICY_TERM_DAYS)).strftime("%Y-%m-%d")
-            
-            quote_request = {
-                "quote": {
-                    "created_date": created_date,
-                    "expiration_date": expiration_date,
-                    "quote_status": "Active",
-                    "locations": [
-                        {
-                            "address": args.get("location", "Unknown Location"),
-                            "property_type": args.get("business_type", "Commercial Building"),
-                            "square_footage": int(args.get("square_footage", DEFAULT_SQUARE_FOOTAGE))
-                        }
-                    ],
-                    "lines": [
-                        {
-                            "line_type": args.get("coverage_type", "Property Insurance"),
-                            "policy_limit": self._parse_amount(args.get("coverage_limit")),
-                            "deductible": self._parse_amount(args.get("deductible"), DEFAULT_DEDUCTIBLE),
-                            "risks": [
-                                {
-                                    "risk_type": RISK_TYPE,
-                                    "location_reference": LOCATION_REFERENCE,
-                                    "risk_description": f"{args.get('coverage_type', 'Property')} risk for {args.get('business_type', 'business')} operation",
-                                    "coverages": [
-                                        {
-                                            "coverage_type": args.get("coverage_type", "Property"),
-                                            "coverage_limit": self._parse_amount(args.get("coverage_limit"))
-                                        }
-                                    ]
-                                }
-                            ]
-                        }
-                    ]
-                }
-            }
+            session.quote_tool = quote_tool
+
+        # Log the quote request
+        logger.info("📤 Sending quote request to MCP server")
+        # Only serialize the request when debug logging is actually enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Quote request data: %s", json.dumps(quote_request))
 
-            # Log the quote request
-            logger.info("📤 Sending quote request to MCP server")
-            logger.debug(f"Quote request data: {json.dumps(quote_request, indent=2)}")
+        # Generate quote via MCP
+        logger.info(f"Generating quote for {args.get('business_type')} - {args.get('coverage_type')}")
+        quote_result = await quote_tool.ainvoke(quote_request)
 
-            # Generate quote via MCP
-            logger.info(f"Generating quote for {args.get('business_type')} - {args.get('coverage_type')}")
-            quote_result = await quote_tool.ainvoke(quote_request)
+        # Log the response
+        logger.info("📥 Received response from MCP server")
+        logger.debug("Quote result: %s", quote_result)
+
+        return str(quote_result)
+
+    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> str:
+        """Generate insurance quote using MCP server."""
+        logger.info("MCP Quote Generator tool invoked!")
+        
+        try:
+            # Validate required parameters
+            required_params = ["business_type", "coverage_type", "coverage_limit", "location"]
+            missing_params = [param for param in required_params if not args.get(param)]
+            
+            if missing_params:
+                error_msg = f"❌ Error: Missing required parameters: {', '.join(missing_params)}"
+                logger.error(error_msg)
+                return error_msg
 
-            # Log the response
-            logger.info("📥 Received response from MCP server")
-            logger.debug(f"Quote result: {quote_result}")
+            # Prepare quote request
+            quote_request = self._build_quote_request(args)
 
-            return str(quote_result)
+            # The MCP session and its server process are shared with other calls on this event loop
+            session = _get_mcp_session(self.mcp_server_path)
+            session.acquire()
+            try:
+                return await self._generate_quote(session, args, quote_request)
+            except Exception:
+                # The MCP server may have died: close the session so the next call starts a new one
+                session.close()
+                raise
+            finally:
+                session.release()
 
         except ImportError as e:
             logger.error(f"Import error: {e}")
@@ -9,22 +9,428 @@
 #
 # END COPYRIGHT
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import re
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 
-from langchain_community.vectorstores import InMemoryVectorStore
+import httpx
+import numpy as np
 from langchain_core.documents import Document
-from langchain_core.vectorstores import VectorStore
 from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from neuro_san.interfaces.coded_tool import CodedTool
+from numpy.typing import ArrayLike
+
+try:
+    import faiss
+except ImportError:
+    # faiss is optional: without it chunks are always searched exhaustively
+    faiss = None
+
+try:
+    import ahocorasick
+except ImportError:
+    # pyahocorasick is optional: without it keywords are found with one substring scan per keyword
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:
+    # hyperscan is optional (and x86-only): without it keywords are found with pyahocorasick, if installed
+    hyperscan = None
+
+try:
+    import numba
+except ImportError:
+    # numba is optional: without it the exhaustive scan is a NumPy einsum
+    numba = None
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
+# numba logs every compilation step at DEBUG level
+logging.getLogger("numba").setLevel(logging.WARNING)
+
+EMBEDDINGS_MODEL = "text-embedding-3-small"
+VECTOR_SIZE = 1536
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+CHUNK_SEPARATORS = ["\n# ", "\n## ", "\n### ", "\n\n", "\n", ". ", " "]
+# Maximum number of inputs the OpenAI embeddings endpoint accepts in a single request
+EMBEDDING_BATCH_SIZE = 2048
+# Connection pool limits of the HTTP client of each embeddings client
+HTTP_MAX_CONNECTIONS = 50
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Below this many chunks an exhaustive scan is as fast as an approximate nearest neighbor search
+HNSW_MIN_CHUNKS = 1000
+# Below this many chunks the exhaustive scan keeps the float32 embeddings: a BLAS matrix-vector
+# product beats the int8 scan up to about this size, at the cost of 4x the memory (60 MB here)
+INT8_MIN_CHUNKS = 10000
+HNSW_NEIGHBORS = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Lower bound on vector norms when normalizing, so that a zero vector does not divide by zero
+MIN_VECTOR_NORM = 1e-12
+
+# Insurance-specific keywords tagged on document chunks
+INSURANCE_KEYWORDS = [
+    "excess", "specialty lines", "surplus lines", "commercial property",
+    "liability", "coverage", "programs", "contractors", "manufacturing",
+    "property damage", "bodily injury", "professional liability",
+    "workers compensation", "cyber liability", "general liability",
+    "auto liability", "umbrella", "crime", "equipment breakdown",
+    "inland marine", "builders risk", "vacant building"
+]
+
+# Embeddings of recent search queries, keyed by (embedding model, query), least recently used first.
+# Module level so that it is shared by every TextFileInfoProvider instance.
+# Values are read-only float32 arrays. Executor threads share the cache, so it is only accessed under the lock.
+QUERY_EMBEDDINGS_CACHE_SIZE = 1024
+_query_embeddings_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_query_embeddings_cache_lock = threading.Lock()
+
+# Embedded chunks of the default data file are cached here, keyed by content and chunking parameters,
+# so that a restart does not have to re-embed a file that has not changed. The directory is created
+# private to the current user, and cache files owned by anyone else are ignored, see _is_trusted_cache_file().
+EMBEDDINGS_CACHE_DIR = os.getenv(
+    "TEXT_FILE_INFO_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "tfip_cache")
+)
+
+# Vector store of the default data file as (file key, ChunkIndex), shared by every TextFileInfoProvider
+# instance. Builds in progress are tracked per event loop as (file key, task), since a task can only be
+# awaited on the loop running it. Weak keys: a build is dropped together with its loop.
+# Not a constant: _async_warmup() rebinds it whenever a build finishes.
+_default_vector_store: Optional[Tuple[Tuple[str, int, int], "ChunkIndex"]] = None  # pylint: disable=invalid-name
+_default_vector_store_builds: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Tuple, asyncio.Task]]" = \
+    weakref.WeakKeyDictionary()
+_default_vector_store_lock = threading.Lock()
+
+# Embeddings clients, one per event loop. neuro-san runs calls on several event loops in separate threads,
+# and an httpx.AsyncClient's pooled connections can only be used on the loop that opened them.
+# Weak keys: a client is dropped together with its loop.
+_embeddings_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OpenAIEmbeddings]" = \
+    weakref.WeakKeyDictionary()
+_embeddings_lock = threading.Lock()
+
+
+def _get_embeddings() -> OpenAIEmbeddings:
+    """
+    Return the embeddings client for the running event loop, creating it on first use.
+
+    Sharing one client and its pooled HTTP connections avoids a new TLS handshake for every instance.
+    """
+    loop = asyncio.get_running_loop()
+    with _embeddings_lock:
+        embeddings = _embeddings_by_loop.get(loop)
+        if embeddings is None:
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+            # chunk_size is the number of texts per embeddings request (default 1000).
+            # Only the async client is given: every embeddings request in this module is async.
+            embeddings = OpenAIEmbeddings(
+                model=EMBEDDINGS_MODEL,
+                dimensions=VECTOR_SIZE,
+                chunk_size=EMBEDDING_BATCH_SIZE,
+                http_async_client=httpx.AsyncClient(limits=limits)
+            )
+            _embeddings_by_loop[loop] = embeddings
+        return embeddings
+
+
+def _build_keyword_automaton():
+    """Compile INSURANCE_KEYWORDS into an Aho-Corasick automaton that finds all of them in a single pass."""
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for keyword in INSURANCE_KEYWORDS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _build_keyword_database():
+    """Compile INSURANCE_KEYWORDS into a case-insensitive Hyperscan database that finds all of them in one pass."""
+    if hyperscan is None:
+        return None
+
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[re.escape(keyword).encode("utf-8") for keyword in INSURANCE_KEYWORDS],
+        ids=list(range(len(INSURANCE_KEYWORDS))),
+        elements=len(INSURANCE_KEYWORDS),
+        # Each keyword only needs to be reported once per scan
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(INSURANCE_KEYWORDS)
+    )
+    return database
+
+
+def _on_keyword_match(keyword_id: int, _start: int, _end: int, _flags: int, matched_ids: set):
+    """Hyperscan match handler collecting the ids of the matched keywords."""
+    matched_ids.add(keyword_id)
+
+
+_KEYWORD_DATABASE = _build_keyword_database()
+# A Hyperscan database has a single scratch space, so scans cannot run concurrently
+_KEYWORD_DATABASE_LOCK = threading.Lock()
+
+
+def _build_scores_kernel():
+    """
+    Build the numba int8 similarity kernel, if numba is installed.
+
+    NumPy has no BLAS kernel for int8 products, so a compiled loop that lets LLVM vectorize
+    the dot products beats the einsum. It runs serially: search() is called from several
+    executor threads at once, which numba's parallel workqueue threading layer does not support.
+    """
+    if numba is None:
+        return None
+
+    @numba.njit(fastmath=True)
+    def int8_scores(quantized, scales, quantized_query, query_scale):
+        num_rows, num_columns = quantized.shape
+        scores = np.empty(num_rows, dtype=np.float32)
+        for i in range(num_rows):
+            total = 0
+            for j in range(num_columns):
+                total += np.int32(quantized[i, j]) * np.int32(quantized_query[j])
+            scores[i] = total * scales[i] * query_scale
+        return scores
+
+    return int8_scores
+
+
+def _compile_scores_kernel():
+    """Compile the int8 similarity kernel by calling it once, then mark it ready for search()."""
+    try:
+        _SCORES_KERNEL(np.zeros((4, VECTOR_SIZE), dtype=np.int8), np.ones(4, dtype=np.float32),
+                       np.zeros(VECTOR_SIZE, dtype=np.int8), np.float32(1.0))
+        _SCORES_KERNEL_READY.set()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning(f"Could not compile the numba similarity kernel, using NumPy instead: {str(e)}")
+
+
+_SCORES_KERNEL = _build_scores_kernel()
+# Set once the kernel is compiled. Compiling takes seconds, so it happens in a background thread
+# rather than blocking the import (and the event loop importing the tool); search() uses the einsum until then.
+_SCORES_KERNEL_READY = threading.Event()
+if _SCORES_KERNEL is not None:
+    threading.Thread(target=_compile_scores_kernel, name="compile-int8-scores", daemon=True).start()
+
+
+def _write_atomically(path: str, write: Callable[[str], None]):
+    """
+    Write a file through a temporary file in the same directory, then move it into place.
+
+    Readers, possibly in other threads or processes, never see a partially written file.
+
+    :param path: Final path of the file
+    :param write: Function writing the file content to the path it is given
+    """
+    directory, file_name = os.path.split(path)
+    # Keep the extension: np.save() appends ".npy" to paths without it
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{file_name}.", suffix=os.path.splitext(path)[1])
+    os.close(handle)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _is_trusted_cache_file(path: str) -> bool:
+    """
+    Whether a cache file may be loaded. The default cache directory is under the shared temporary
+    directory, so a file another user planted there must not be served as RAG content.
+
+    :param path: Path of the cache file
+    :return: True if the file is owned by the current user
+    """
+    if not hasattr(os, "getuid"):
+        # Windows has no uids, and its temporary directory is already private to the user
+        return True
+    try:
+        return os.stat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+class ChunkIndex:
+    """
+    In-memory vector store for embedded document chunks.
+
+    The chunk embeddings are L2-normalized once, when they are embedded, and stacked into one
+    contiguous (N, VECTOR_SIZE) matrix. Cosine similarity against every chunk is then a
+    single matrix-vector product with the normalized query, instead of a Python loop
+    over the stored documents. From INT8_MIN_CHUNKS chunks the matrix is quantized to int8
+    with one float32 scale per row, a quarter of the memory of float32 embeddings.
+
+    When faiss is installed, there are at least HNSW_MIN_CHUNKS chunks and the index is
+    persisted to hnsw_index_path, an HNSW graph index is used instead, for sub-linear approximate
+    nearest neighbor search. Building the graph takes far longer than one exhaustive scan, so
+    an index that is only searched once, without being persisted, always uses the scan.
+
+    The chunks are also indexed by the keywords in their "keywords" metadata, so
+    keyword lookups need no query embedding at all.
+    """
+
+    def __init__(self, documents: List[Document], vectors: np.ndarray, hnsw_index_path: Optional[str] = None):
+        """
+        :param documents: The document chunks, in the same order as vectors
+        :param vectors: The (N, VECTOR_SIZE) L2-normalized embeddings of the document chunks,
+            see normalize()
+        :param hnsw_index_path: Optional path to load the HNSW index from, or to save it to once built.
+            Without it no HNSW index is used.
+        """
+        self.documents: List[Document] = documents
+        self.keyword_index: Dict[str, List[int]] = {}
+        for i, document in enumerate(documents):
+            for keyword in document.metadata.get("keywords", []):
+                self.keyword_index.setdefault(keyword, []).append(i)
+
+        # Only one of the HNSW index, the float32 matrix and the int8 matrix is set, see search()
+        self.hnsw_index = None
+        self.matrix: Optional[np.ndarray] = None
+        self.quantized: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+
+        # No copy when the vectors already are a contiguous float32 matrix, e.g. memory-mapped from the cache
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        if faiss is not None and hnsw_index_path and len(documents) >= HNSW_MIN_CHUNKS:
+            self.hnsw_index = self._get_hnsw_index(matrix, hnsw_index_path)
+        elif len(documents) >= INT8_MIN_CHUNKS:
+            self.quantized, self.scales = self._quantize(matrix)
+        else:
+            self.matrix = matrix
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize a vector, or each row of a matrix.
+
+        :param vectors: A (VECTOR_SIZE,) vector or an (N, VECTOR_SIZE) matrix
+        :return: A new float32 array of unit-length vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, MIN_VECTOR_NORM)
+
+    @staticmethod
+    def _get_hnsw_index(matrix: np.ndarray, hnsw_index_path: str):
+        """
+        Load the HNSW index for the normalized matrix from disk, or build and save it.
+
+        :param matrix: The (N, VECTOR_SIZE) normalized embeddings
+        :param hnsw_index_path: Path of the persisted index
+        :return: A faiss HNSW index over the rows of the matrix
+        """
+        if os.path.exists(hnsw_index_path) and _is_trusted_cache_file(hnsw_index_path):
+            try:
+                index = faiss.read_index(hnsw_index_path)
+                if index.ntotal == matrix.shape[0]:
+                    index.hnsw.efSearch = HNSW_EF_SEARCH
+                    logger.info(f"Loaded HNSW index from: {hnsw_index_path}")
+                    return index
+                logger.warning(f"Ignoring HNSW index with {index.ntotal} vectors at: {hnsw_index_path}")
+            except RuntimeError as e:
+                logger.warning(f"Ignoring unreadable HNSW index at {hnsw_index_path}: {str(e)}")
+
+        # Inner product of normalized vectors is their cosine similarity
+        index = faiss.IndexHNSWFlat(matrix.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.add(matrix)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        logger.info(f"Built HNSW index over {matrix.shape[0]} document chunks")
+
+        try:
+            _write_atomically(hnsw_index_path, lambda temp_path: faiss.write_index(index, temp_path))
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Failed to save HNSW index to {hnsw_index_path}: {str(e)}")
+        return index
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize float vectors to int8 with a symmetric scale per vector.
+
+        :param vectors: A (VECTOR_SIZE,) vector or an (N, VECTOR_SIZE) matrix
+        :return: The int8 values and the scales that map them back to floats
+        """
+        scales = np.max(np.abs(vectors), axis=-1, keepdims=True) / 127.0
+        scales = np.maximum(scales, np.finfo(np.float32).tiny).astype(np.float32)
+        quantized = np.ascontiguousarray(np.round(vectors / scales), dtype=np.int8)
+        return quantized, np.squeeze(scales, axis=-1)
+
+    def keyword_search(self, keyword: str, k: int) -> List[Document]:
+        """
+        Find the document chunks tagged with a keyword.
+
+        :param keyword: A lowercase keyword, such as one of INSURANCE_KEYWORDS
+        :param k: Number of document chunks to return
+        :return: Up to k document chunks tagged with the keyword, in document order
+        """
+        return [self.documents[i] for i in self.keyword_index.get(keyword, [])[:k]]
+
+    def search(self, query_vector: ArrayLike, k: int) -> List[Document]:
+        """
+        Find the document chunks most similar to a query.
+
+        :param query_vector: Embedding of the search query
+        :param k: Number of document chunks to return
+        :return: Up to k document chunks, most similar first
+        """
+        k = min(k, len(self.documents))
+        if k <= 0:
+            return []
+
+        # Only the query needs normalizing: the chunk vectors were normalized when they were embedded
+        query = self.normalize(query_vector)
+
+        if self.hnsw_index is not None:
+            _, indices = self.hnsw_index.search(query.reshape(1, -1), k)
+            # faiss pads with -1 when it finds fewer than k neighbors
+            return [self.documents[i] for i in indices[0] if i >= 0]
+
+        if self.matrix is not None:
+            scores = self.matrix @ query
+        else:
+            quantized_query, query_scale = self._quantize(query)
+            if _SCORES_KERNEL_READY.is_set():
+                scores = _SCORES_KERNEL(self.quantized, self.scales, quantized_query, np.float32(query_scale))
+            else:
+                # Accumulate the int8 products in int32: a 1536-term sum of 127 * 127 overflows int16
+                raw_scores = np.einsum("ij,j->i", self.quantized, quantized_query, dtype=np.int32)
+                scores = raw_scores * (self.scales * query_scale)
+
+        # Select the top k without sorting every score, then order just those
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.documents[i] for i in top]
 
 
 class TextFileInfoProvider(CodedTool):
@@ -36,52 +442,242 @@ class TextFileInfoProvider(CodedTool):
     semantic search and improved query understanding.
     """
 
+    # Shared by all instances, created on first use: building it loads the tiktoken encoding
+    _splitter: Optional[RecursiveCharacterTextSplitter] = None
+
     def __init__(self):
         super().__init__()
-        self.vector_store: Optional[VectorStore] = None
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=1536)
-        self._initialize_vector_store()
+        self.default_file_path: str = self._resolve_path("data/excess_specialty_lines_info.txt")
+
+    @property
+    def embeddings(self) -> OpenAIEmbeddings:
+        """The embeddings client for the running event loop."""
+        return _get_embeddings()
+
+    @staticmethod
+    def _resolve_path(file_path: str) -> str:
+        """Convert a path relative to the project root into an absolute path."""
+        if os.path.isabs(file_path):
+            return file_path
+
+        # Get the directory where this script is located
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        # Go up one level to get to the project root
+        project_root = os.path.dirname(script_dir)
+        return os.path.join(project_root, file_path)
+
+    async def _get_default_vector_store(self) -> Optional[ChunkIndex]:
+        """
+        Return the vector store of the default data file, building it on first use.
 
-    def _initialize_vector_store(self):
-        """Initialize the vector store with the default excess specialty lines data."""
+        neuro-san creates a new instance for every call, so the vector store is cached at module level,
+        keyed by the file's path, modification time and size: an edited file is rebuilt, without
+        re-reading an unchanged one on every call. Concurrent calls on one event loop share a single build.
+        """
+        file_path = self.default_file_path
         try:
-            # Default to the excess specialty lines info file
-            file_path = "data/excess_specialty_lines_info.txt"
-            
-            # Convert relative path to absolute path from the project root
-            if not os.path.isabs(file_path):
-                # Get the directory where this script is located
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                # Go up one level to get to the project root
-                project_root = os.path.dirname(script_dir)
-                file_path = os.path.join(project_root, file_path)
+            stat = os.stat(file_path)
+        except OSError:
+            logger.warning(f"Default data file not found at: {file_path}")
+            return None
+        file_key = (file_path, stat.st_mtime_ns, stat.st_size)
+
+        loop = asyncio.get_running_loop()
+        with _default_vector_store_lock:
+            if _default_vector_store is not None and _default_vector_store[0] == file_key:
+                return _default_vector_store[1]
+
+            build = _default_vector_store_builds.get(loop)
+            if build is None or build[0] != file_key:
+                build = (file_key, loop.create_task(self._async_warmup(file_path, file_key)))
+                _default_vector_store_builds[loop] = build
+
+        # Shielded: a cancelled call must not cancel the build other calls are waiting on
+        return await asyncio.shield(build[1])
+
+    async def _async_warmup(self, file_path: str, file_key: Tuple[str, int, int]) -> Optional[ChunkIndex]:
+        """
+        Build the vector store of the default excess specialty lines data, and cache it at module level.
 
-            if not os.path.exists(file_path):
-                logger.warning(f"Default data file not found at: {file_path}")
-                return
+        :return: The vector store, or None if it could not be built. Failures are not cached.
+        """
+        global _default_vector_store  # pylint: disable=global-statement
+        try:
+            # Load and process the document off the event loop
+            content = await asyncio.to_thread(self._read_file, file_path)
 
-            # Load and process the document
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            # Reuse the embedded chunks from a previous run when the file has not changed
+            cache_key = self._get_cache_key(content)
+            cached = await asyncio.to_thread(self._load_cached_embeddings, cache_key)
 
-            # Create document chunks for better retrieval
-            documents = self._create_documents_from_content(content, file_path)
-            
-            if documents:
-                # Create vector store
-                self.vector_store = InMemoryVectorStore.from_documents(
-                    documents=documents,
-                    embedding=self.embeddings
-                )
-                logger.info(f"Vector store initialized with {len(documents)} document chunks")
+            if cached:
+                texts, metadatas, vectors = cached
             else:
-                logger.warning("No documents created from content")
+                # Create document chunks for better retrieval
+                texts, metadatas = await asyncio.to_thread(self._create_documents_from_content, content, file_path)
+
+                if not texts:
+                    logger.warning("No documents created from content")
+                    return None
+
+                vectors = await self._aembed_texts(texts)
+                await asyncio.to_thread(self._save_cached_embeddings, cache_key, texts, metadatas, vectors)
+
+            hnsw_index_path = os.path.join(EMBEDDINGS_CACHE_DIR, f"{cache_key}.faiss")
+            vector_store = await asyncio.to_thread(
+                self._build_vector_store, texts, metadatas, vectors, hnsw_index_path
+            )
+            logger.info(f"Vector store initialized with {len(texts)} document chunks")
+
+            with _default_vector_store_lock:
+                _default_vector_store = (file_key, vector_store)
+            return vector_store
 
         except Exception as e:
             logger.error(f"Error initializing vector store: {str(e)}")
+            return None
+
+        finally:
+            # The build is finished, so later calls use the cached vector store or start a new build
+            loop = asyncio.get_running_loop()
+            with _default_vector_store_lock:
+                build = _default_vector_store_builds.get(loop)
+                if build is not None and build[1] is asyncio.current_task():
+                    del _default_vector_store_builds[loop]
+
+    async def _aembed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts asynchronously, sending the EMBEDDING_BATCH_SIZE batches concurrently.
+
+        :return: The (N, VECTOR_SIZE) L2-normalized embeddings of the texts
+        """
+        batches = await asyncio.gather(*[
+            self.embeddings.aembed_documents(texts[start:start + EMBEDDING_BATCH_SIZE])
+            for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+        ])
+        return ChunkIndex.normalize([vector for batch in batches for vector in batch])
+
+    async def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, reusing the embedding when the same query was asked recently."""
+        key = (EMBEDDINGS_MODEL, query)
+        with _query_embeddings_cache_lock:
+            vector = _query_embeddings_cache.get(key)
+            if vector is not None:
+                _query_embeddings_cache.move_to_end(key)
+                return vector
+
+        vector = np.asarray(await self.embeddings.aembed_query(query), dtype=np.float32)
+        vector.flags.writeable = False
+        with _query_embeddings_cache_lock:
+            _query_embeddings_cache[key] = vector
+            if len(_query_embeddings_cache) > QUERY_EMBEDDINGS_CACHE_SIZE:
+                _query_embeddings_cache.popitem(last=False)
+        return vector
+
+    @staticmethod
+    def _get_cache_key(content: str) -> str:
+        """
+        Build the embeddings cache key from the file content, embedding model, chunking parameters
+        and the keywords tagged on the cached chunks.
+        """
+        hasher = hashlib.sha256()
+        # "l2-normalized" tells these entries apart from older caches of raw, unnormalized embeddings
+        for part in (content, EMBEDDINGS_MODEL, str(VECTOR_SIZE), str(CHUNK_SIZE), str(CHUNK_OVERLAP),
+                     json.dumps(CHUNK_SEPARATORS), json.dumps(INSURANCE_KEYWORDS), "l2-normalized"):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _load_cached_embeddings(cache_key: str) -> Optional[Tuple[List[str], List[Dict[str, Any]], np.ndarray]]:
+        """
+        Load previously embedded chunks from the cache directory.
+
+        The embeddings matrix is memory-mapped rather than read into memory.
+
+        :param cache_key: Key returned by _get_cache_key()
+        :return: A (texts, metadatas, vectors) tuple, or None on a cache miss
+        """
+        chunks_path = os.path.join(EMBEDDINGS_CACHE_DIR, f"{cache_key}.json")
+        vectors_path = os.path.join(EMBEDDINGS_CACHE_DIR, f"{cache_key}.npy")
+        if not (os.path.exists(chunks_path) and os.path.exists(vectors_path)):
+            return None
+
+        if not (_is_trusted_cache_file(chunks_path) and _is_trusted_cache_file(vectors_path)):
+            logger.warning(f"Ignoring embeddings cache {cache_key} not owned by the current user")
+            return None
 
-    def _create_documents_from_content(self, content: str, source_path: str) -> List[Document]:
-        """Create and split documents from text content for optimal retrieval."""
+        # Any malformed entry is a cache miss, so that it is overwritten with a freshly embedded one
+        try:
+            with open(chunks_path, 'r', encoding='utf-8') as file:
+                chunks = json.load(file)
+            vectors = np.load(vectors_path, mmap_mode="r")
+            texts, metadatas = chunks["texts"], chunks["metadatas"]
+            consistent = (isinstance(texts, list) and isinstance(metadatas, list)
+                          and vectors.shape == (len(texts), VECTOR_SIZE) and len(metadatas) == len(texts))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable embeddings cache {cache_key}: {str(e)}")
+            return None
+
+        if not consistent:
+            logger.warning(f"Ignoring inconsistent embeddings cache {cache_key}")
+            return None
+
+        logger.info(f"Loaded {vectors.shape[0]} embedded chunks from cache: {vectors_path}")
+        return texts, metadatas, vectors
+
+    @staticmethod
+    def _save_cached_embeddings(cache_key: str, texts: List[str], metadatas: List[Dict[str, Any]],
+                                vectors: np.ndarray):
+        """Save embedded chunks to the cache directory so the next start can skip embedding."""
+        try:
+            # Private to the current user: the default directory is under the shared temporary directory
+            os.makedirs(EMBEDDINGS_CACHE_DIR, mode=0o700, exist_ok=True)
+
+            def write_chunks(temp_path: str):
+                with open(temp_path, 'w', encoding='utf-8') as file:
+                    json.dump({"texts": texts, "metadatas": metadatas}, file)
+
+            # Write the vectors last: a cache entry only counts once both files exist
+            _write_atomically(os.path.join(EMBEDDINGS_CACHE_DIR, f"{cache_key}.json"), write_chunks)
+            _write_atomically(os.path.join(EMBEDDINGS_CACHE_DIR, f"{cache_key}.npy"),
+                              lambda temp_path: np.save(temp_path, vectors))
+            logger.info(f"Saved {len(texts)} embedded chunks to cache: {EMBEDDINGS_CACHE_DIR}")
+        except OSError as e:
+            logger.warning(f"Failed to save embeddings cache: {str(e)}")
+
+    @staticmethod
+    def _build_vector_store(texts: List[str], metadatas: List[Dict[str, Any]], vectors: np.ndarray,
+                            hnsw_index_path: Optional[str] = None) -> ChunkIndex:
+        """Build an in-memory vector store from chunks that are already embedded."""
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        return ChunkIndex(documents, vectors, hnsw_index_path)
+
+    @classmethod
+    def _get_splitter(cls) -> RecursiveCharacterTextSplitter:
+        """Return the text splitter shared by all instances, creating it on first use."""
+        if cls._splitter is None:
+            # Using smaller chunks for insurance content to maintain context
+            cls._splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+                chunk_size=CHUNK_SIZE,  # Larger chunks for insurance content
+                chunk_overlap=CHUNK_OVERLAP,  # Good overlap to maintain context
+                separators=CHUNK_SEPARATORS
+            )
+        return cls._splitter
+
+    @staticmethod
+    def _read_file(file_path: str) -> str:
+        """Read a UTF-8 text file."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def _create_documents_from_content(self, content: str,
+                                       source_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Create and split documents from text content for optimal retrieval.
+
+        :return: The texts of the document chunks and their metadata, in the same order
+        """
         try:
             # Create a document from the content
             doc = Document(
@@ -94,14 +690,7 @@ class TextFileInfoProvider(CodedTool):
             )
 
             # Split the document into smaller chunks for better embedding and retrieval
-            # Using smaller chunks for insurance content to maintain context
-            text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                chunk_size=800,  # Larger chunks for insurance content
-                chunk_overlap=100,  # Good overlap to maintain context
-                separators=["\n# ", "\n## ", "\n### ", "\n\n", "\n", ". ", " "]
-            )
-
-            doc_chunks = text_splitter.split_documents([doc])
+            doc_chunks = self._get_splitter().split_documents([doc])
             
             # Add additional metadata to chunks for better retrieval
             for i, chunk in enumerate(doc_chunks):
@@ -112,27 +701,32 @@ class TextFileInfoProvider(CodedTool):
                 })
 
             logger.info(f"Created {len(doc_chunks)} document chunks")
-            return doc_chunks
+            return [chunk.page_content for chunk in doc_chunks], [chunk.metadata for chunk in doc_chunks]
 
         except Exception as e:
             logger.error(f"Error creating documents from content: {str(e)}")
-            return []
+            return [], []
 
-    def _extract_keywords(self, text: str) -> List[str]:
+    @staticmethod
+    def _extract_keywords(text: str) -> List[str]:
         """Extract relevant keywords from text content for enhanced metadata."""
-        # Insurance-specific keywords
-        insurance_keywords = [
-            "excess", "specialty lines", "surplus lines", "commercial property", 
-            "liability", "coverage", "programs", "contractors", "manufacturing",
-            "property damage", "bodily injury", "professional liability",
-            "workers compensation", "cyber liability", "general liability",
-            "auto liability", "umbrella", "crime", "equipment breakdown",
-            "inland marine", "builders risk", "vacant building"
-        ]
-        
+        if _KEYWORD_DATABASE is not None:
+            # Matching is case-insensitive, so the text is not lowercased first
+            matched_ids = set()
+            with _KEYWORD_DATABASE_LOCK:
+                _KEYWORD_DATABASE.scan(text.encode("utf-8"), match_event_handler=_on_keyword_match,
+                                       context=matched_ids)
+            return [keyword for i, keyword in enumerate(INSURANCE_KEYWORDS) if i in matched_ids]
+
         text_lower = text.lower()
-        found_keywords = [keyword for keyword in insurance_keywords if keyword in text_lower]
-        return found_keywords
+
+        if _KEYWORD_AUTOMATON is None:
+            return [keyword for keyword in INSURANCE_KEYWORDS if keyword in text_lower]
+
+        # The automaton reports overlapping matches too, e.g. "liability" inside "general liability"
+        matched = {keyword for _, keyword in _KEYWORD_AUTOMATON.iter(text_lower)}
+        # Keep the keywords in INSURANCE_KEYWORDS order, as the substring scan does
+        return [keyword for keyword in INSURANCE_KEYWORDS if keyword in matched]
 
     async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> str:
         """
@@ -161,8 +755,9 @@ class TextFileInfoProvider(CodedTool):
         if file_path and file_path != "data/excess_specialty_lines_info.txt":
             return await self._query_custom_file(file_path, query, section, max_chars)
 
-        # Use the pre-built vector store for the default file
-        if not self.vector_store:
+        # Use the shared vector store of the default file
+        vector_store = await self._get_default_vector_store()
+        if not vector_store:
             return "Error: Vector store not initialized. Please check the excess_specialty_lines_info.txt file exists."
 
         try:
@@ -172,9 +767,15 @@ class TextFileInfoProvider(CodedTool):
             if not search_query:
                 search_query = "excess specialty lines insurance coverage programs"
 
-            # Perform semantic search using the vector store
-            retriever = self.vector_store.as_retriever(search_kwargs={"k": k})
-            results = await retriever.ainvoke(search_query)
+            # A query that is just a known keyword (e.g. section="programs") is answered from
+            # the keyword index. The raw query is used: search_query always gets extra context terms.
+            keyword = " ".join(part for part in (section, query) if part).strip().lower()
+            results = vector_store.keyword_search(keyword, k) if keyword else []
+
+            if not results:
+                # Perform semantic search using the vector store
+                query_vector = await self._embed_query(search_query)
+                results = vector_store.search(query_vector, k)
 
             if not results:
                 return f"No relevant information found for query: '{search_query}'"
@@ -214,74 +815,58 @@ class TextFileInfoProvider(CodedTool):
         if not results:
             return "No relevant information found."
 
-        # Start with a header
-        response = f"Found relevant information for '{query}' in excess and specialty lines documentation:\n\n"
-        
-        # Combine content from retrieved documents
-        combined_content = []
-        total_chars = len(response)
-        
+        # Collect the header and sections in one list, joined once at the end
+        parts = [f"Found relevant information for '{query}' in excess and specialty lines documentation:"]
+        total_chars = len(parts[0])
+
         for i, doc in enumerate(results):
             content = doc.page_content.strip()
-            
-            # Add section separator
             section_header = f"--- Section {i+1} ---\n"
-            section_content = section_header + content
-            
-            # Check if adding this section would exceed max_chars
-            if total_chars + len(section_content) + 2 > max_chars:  # +2 for \n\n
+            section_chars = len(section_header) + len(content)
+
+            # Check if adding this section would exceed max_chars (+2 for the \n\n separator)
+            if total_chars + 2 + section_chars > max_chars:
                 remaining_chars = max_chars - total_chars - 2
                 if remaining_chars > 100:  # Only add if we have reasonable space
-                    truncated_content = content[:remaining_chars-20] + "..."
-                    combined_content.append(section_header + truncated_content)
+                    parts.append(section_header + content[:remaining_chars - len(section_header) - 3] + "...")
                 break
-            
-            combined_content.append(section_content)
-            total_chars += len(section_content) + 2
 
-        response += "\n\n".join(combined_content)
-        
+            parts.append(section_header + content)
+            total_chars += 2 + section_chars
+
         # Add metadata about the search
         if len(results) > 1:
-            response += f"\n\n[Retrieved {len(combined_content)} relevant sections from {len(results)} total matches]"
-        
-        return response
+            parts.append(f"[Retrieved {len(parts) - 1} relevant sections from {len(results)} total matches]")
+
+        return "\n\n".join(parts)
 
     async def _query_custom_file(self, file_path: str, query: str, section: str, max_chars: int) -> str:
         """Handle queries for custom file paths by creating a temporary vector store."""
         try:
             # Convert relative path to absolute path from the project root
-            if not os.path.isabs(file_path):
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                project_root = os.path.dirname(script_dir)
-                file_path = os.path.join(project_root, file_path)
+            file_path = self._resolve_path(file_path)
 
             if not os.path.exists(file_path):
                 return f"Error: File not found at path: {file_path}"
 
-            # Read the custom file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            # Read and split the custom file off the event loop
+            content = await asyncio.to_thread(self._read_file, file_path)
+            texts, metadatas = await asyncio.to_thread(self._create_documents_from_content, content, file_path)
 
-            # Create documents and temporary vector store
-            documents = self._create_documents_from_content(content, file_path)
-            
-            if not documents:
+            if not texts:
                 return f"Error: Could not process content from {file_path}"
 
-            # Create temporary vector store
-            temp_vector_store = InMemoryVectorStore.from_documents(
-                documents=documents,
-                embedding=self.embeddings
-            )
+            # Create temporary vector store. It is searched once, so it is not given an HNSW index
+            vectors = await self._aembed_texts(texts)
+            temp_vector_store = await asyncio.to_thread(self._build_vector_store, texts, metadatas, vectors)
 
             # Perform search on temporary vector store
             search_query = self._build_search_query(query, section)
             if not search_query:
                 search_query = "information content"
 
-            retriever = temp_vector_store.as_retriever(search_kwargs={"k": 4})
-            results = await retriever.ainvoke(search_query)
+            query_vector = await self._embed_query(search_query)
+            results = temp_vector_store.search(query_vector, 4)
 
             if not results:
                 # Fallback to simple content return
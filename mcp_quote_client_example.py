@@ -7,172 +7,157 @@ Demonstrates how to use langchain-mcp-adapters to connect to the quote MCP serve
 import asyncio
 import json
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 
+MCP_SERVER_NAME = "create-quote"
 
-async def test_mcp_quote_client():
-    """Test the MCP quote generation client directly."""
-    
-    # Configure MCP client connection
-    client = MultiServerMCPClient(
-        {
-            "create-quote": {
-                "transport": "stdio",
-                "command": "node",
-                "args": ["c:\\POC\\quote_mcp_server_simple\\index.js"],
-                "env": {}
-            }
+
+def build_complex_request() -> Dict[str, Any]:
+    """Build a sample quote request in the full nested quote format."""
+    now = datetime.now()
+    return {
+        "quote": {
+            "created_date": now.strftime("%Y-%m-%d"),
+            "expiration_date": (now + timedelta(days=365)).strftime("%Y-%m-%d"),
+            "quote_status": "Active",
+            "locations": [
+                {
+                    "address": "123 Business St, New York, NY 10001",
+                    "property_type": "Restaurant",
+                    "square_footage": 5000
+                }
+            ],
+            "lines": [
+                {
+                    "line_type": "General Liability",
+                    "policy_limit": 2000000,
+                    "deductible": 1000,
+                    "risks": [
+                        {
+                            "risk_type": "General Business Risk",
+                            "location_reference": "LOC-001",
+                            "risk_description": "General Liability risk for Restaurant operation",
+                            "coverages": [
+                                {
+                                    "coverage_type": "General Liability",
+                                    "coverage_limit": 2000000
+                                }
+                            ]
+                        }
+                    ]
+                }
+            ]
         }
-    )
-    
+    }
+
+
+def build_simple_request() -> Dict[str, Any]:
+    """Build a sample quote request in the simple parameter format that might be expected by MCP server."""
+    return {
+        "business_type": "Restaurant",
+        "coverage_type": "General Liability",
+        "coverage_limit": "2000000",
+        "location": "123 Business St, New York, NY 10001",
+        "square_footage": "5000",
+        "deductible": "1000"
+    }
+
+
+def find_quote_tool(tools: List[Any]) -> Optional[Any]:
+    """Find the quote creation tool among the MCP server tools."""
+    return next((tool for tool in tools if "quote" in tool.name.lower()), None)
+
+
+async def test_mcp_quote_client(quote_tool: Any):
+    """Test the MCP quote generation client with the full quote format."""
     try:
-        # Get available tools from MCP server
-        print("🔌 Connecting to MCP server...")
-        tools = await client.get_tools()
-        
-        if not tools:
-            print("❌ No tools available from MCP server")
-            return
-        
-        print(f"✅ Connected! Found {len(tools)} tool(s):")
-        for i, tool in enumerate(tools):
-            print(f"  {i+1}. {tool.name}: {tool.description}")
-        
-        # Prepare sample quote request
         print("\n📝 Preparing quote request...")
-        sample_request = {
-            "quote": {
-                "created_date": datetime.now().strftime("%Y-%m-%d"),
-                "expiration_date": (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%d"),
-                "quote_status": "Active",
-                "locations": [
-                    {
-                        "address": "123 Business St, New York, NY 10001",
-                        "property_type": "Restaurant",
-                        "square_footage": 5000
-                    }
-                ],
-                "lines": [
-                    {
-                        "line_type": "General Liability",
-                        "policy_limit": 2000000,
-                        "deductible": 1000,
-                        "risks": [
-                            {
-                                "risk_type": "General Business Risk",
-                                "location_reference": "LOC-001",
-                                "risk_description": "General Liability risk for Restaurant operation",
-                                "coverages": [
-                                    {
-                                        "coverage_type": "General Liability",
-                                        "coverage_limit": 2000000
-                                    }
-                                ]
-                            }
-                        ]
-                    }
-                ]
-            }
-        }
-        
+        sample_request = build_complex_request()
+
         print("📤 Sending request to MCP server...")
         print(f"Request: {json.dumps(sample_request, indent=2)}")
-        
-        # Call the quote creation tool (second tool, index 1)
-        quote_tool = None
-        for tool in tools:
-            if "quote" in tool.name.lower():
-                quote_tool = tool
-                break
-        
-        if not quote_tool:
-            print("❌ Quote creation tool not found")
-            return
-            
+
         print(f"📞 Using tool: {quote_tool.name}")
         result = await quote_tool.ainvoke(sample_request)
-        
+
         print("\n📥 Response received:")
         print(f"Result: {result}")
         print(f"Type: {type(result)}")
-        
+
         return result
-        
+
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
         traceback.print_exc()
         return None
-    
-    finally:
-        # Clean up connection if available
-        if hasattr(client, 'close'):
-            await client.close()
 
 
-async def test_simple_parameters():
+async def test_simple_parameters(quote_tool: Any):
     """Test with simple parameter format that might be expected by MCP server."""
-    
+    try:
+        simple_request = build_simple_request()
+
+        print("\n🔄 Testing with simple parameters...")
+        print(f"Request: {json.dumps(simple_request, indent=2)}")
+
+        print(f"📞 Using tool: {quote_tool.name}")
+        result = await quote_tool.ainvoke(simple_request)
+        print(f"✅ Result: {result}")
+
+        return result
+
+    except Exception as e:
+        print(f"❌ Error with simple parameters: {e}")
+        return None
+
+
+async def main():
+    """Run both tests over a single MCP session, so the MCP server process is started only once."""
+
+    # Configure MCP client connection
     client = MultiServerMCPClient(
         {
-            "create-quote": {
-                "transport": "stdio", 
+            MCP_SERVER_NAME: {
+                "transport": "stdio",
                 "command": "node",
                 "args": ["c:\\POC\\quote_mcp_server_simple\\index.js"],
                 "env": {}
             }
         }
     )
-    
-    try:
-        tools = await client.get_tools()
+
+    # Get available tools from MCP server. Tools loaded from an open session reuse it for every call,
+    # whereas client.get_tools() would start a new server process per tool call.
+    print("🔌 Connecting to MCP server...")
+    async with client.session(MCP_SERVER_NAME) as session:
+        tools = await load_mcp_tools(session)
+
         if not tools:
-            print("❌ No tools available")
+            print("❌ No tools available from MCP server")
             return
-        
-        # Try with simplified parameters
-        simple_request = {
-            "business_type": "Restaurant",
-            "coverage_type": "General Liability", 
-            "coverage_limit": "2000000",
-            "location": "123 Business St, New York, NY 10001",
-            "square_footage": "5000",
-            "deductible": "1000"
-        }
-        
-        print("\n🔄 Testing with simple parameters...")
-        print(f"Request: {json.dumps(simple_request, indent=2)}")
-        
-        # Find the quote creation tool
-        quote_tool = None
-        for tool in tools:
-            if "quote" in tool.name.lower():
-                quote_tool = tool
-                break
-        
+
+        print(f"✅ Connected! Found {len(tools)} tool(s):")
+        for i, tool in enumerate(tools):
+            print(f"  {i+1}. {tool.name}: {tool.description}")
+
+        quote_tool = find_quote_tool(tools)
         if not quote_tool:
             print("❌ Quote creation tool not found")
             return
-            
-        print(f"📞 Using tool: {quote_tool.name}")
-        result = await quote_tool.ainvoke(simple_request)
-        print(f"✅ Result: {result}")
-        
-        return result
-        
-    except Exception as e:
-        print(f"❌ Error with simple parameters: {e}")
-        return None
+
+        # Test both complex and simple parameter formats
+        await test_mcp_quote_client(quote_tool)
+        await test_simple_parameters(quote_tool)
 
 
 if __name__ == "__main__":
     print("🚀 Starting MCP Quote Client Test")
     print("=" * 50)
-    
-    # Test both complex and simple parameter formats
-    asyncio.run(test_mcp_quote_client())
-    asyncio.run(test_simple_parameters())
-    
-    print("\n✅ Test completed!")
\ No newline at end of file
+
+    asyncio.run(main())
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,287 @@
+# Copyright © 2025 Cognizant Technology Solutions Corp, www.cognizant.com.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# END COPYRIGHT
+
+import asyncio
+import contextlib
+import sys
+import types
+from datetime import datetime
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import patch
+
+from coded_tools import mcp_quote_generator
+from coded_tools.mcp_quote_generator import DEFAULT_DEDUCTIBLE
+from coded_tools.mcp_quote_generator import McpQuoteGenerator
+
+
+class TestParseAmount(TestCase):
+    """
+    Unit tests for the monetary amount parsing of the McpQuoteGenerator CodedTool.
+    """
+
+    def test_int(self):
+        """Ints are returned as they are."""
+        self.assertEqual(McpQuoteGenerator._parse_amount(2000000), 2000000)
+
+    def test_float(self):
+        """Floats are truncated to ints."""
+        self.assertEqual(McpQuoteGenerator._parse_amount(1500.75), 1500)
+
+    def test_decimal(self):
+        """Decimals are truncated to ints."""
+        self.assertEqual(McpQuoteGenerator._parse_amount(Decimal("2500.50")), 2500)
+
+    def test_formatted_string(self):
+        """Currency symbols, thousands separators and whitespace are stripped from strings."""
+        self.assertEqual(McpQuoteGenerator._parse_amount("$1,000"), 1000)
+        self.assertEqual(McpQuoteGenerator._parse_amount(" $2,000,000 "), 2000000)
+
+    def test_empty_string(self):
+        """A string with no digits left falls back to the default."""
+        self.assertEqual(McpQuoteGenerator._parse_amount("$"), 1000000)
+        self.assertEqual(McpQuoteGenerator._parse_amount("$", 500), 500)
+
+    def test_none(self):
+        """A missing amount falls back to the default."""
+        self.assertEqual(McpQuoteGenerator._parse_amount(None), 1000000)
+        self.assertEqual(McpQuoteGenerator._parse_amount(None, DEFAULT_DEDUCTIBLE), DEFAULT_DEDUCTIBLE)
+
+
+class TestBuildQuoteRequest(TestCase):
+    """
+    Unit tests for the quote request built by the McpQuoteGenerator CodedTool.
+    """
+
+    ARGS = {
+        "business_type": "Restaurant",
+        "coverage_type": "General Liability",
+        "coverage_limit": "$2,000,000",
+        "location": "123 Business St, New York, NY 10001",
+        "square_footage": "5000",
+        "deductible": "2,500",
+    }
+
+    def test_request_shape(self):
+        """The request nests one location and one line with one risk and one coverage."""
+        with patch("coded_tools.mcp_quote_generator.datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime(2025, 3, 1, 12, 30)
+            request = McpQuoteGenerator._build_quote_request(self.ARGS)
+
+        # The clock is read once for both dates
+        mock_datetime.now.assert_called_once_with()
+
+        quote = request["quote"]
+        self.assertEqual(quote["created_date"], "2025-03-01")
+        self.assertEqual(quote["expiration_date"], "2026-03-01")
+        self.assertEqual(quote["quote_status"], "Active")
+        self.assertEqual(quote["locations"], [
+            {
+                "address": "123 Business St, New York, NY 10001",
+                "property_type": "Restaurant",
+                "square_footage": 5000
+            }
+        ])
+
+        self.assertEqual(len(quote["lines"]), 1)
+        line = quote["lines"][0]
+        self.assertEqual(line["line_type"], "General Liability")
+        self.assertEqual(line["deductible"], 2500)
+        self.assertEqual(len(line["risks"]), 1)
+        risk = line["risks"][0]
+        self.assertEqual(risk["risk_description"], "General Liability risk for Restaurant operation")
+        self.assertEqual(risk["coverages"], [{"coverage_type": "General Liability", "coverage_limit": 2000000}])
+
+    def test_policy_limit_matches_coverage_limit(self):
+        """The line's policy limit and its coverage limit are the same parsed amount."""
+        request = McpQuoteGenerator._build_quote_request(self.ARGS)
+        line = request["quote"]["lines"][0]
+        self.assertEqual(line["policy_limit"], 2000000)
+        self.assertEqual(line["policy_limit"], line["risks"][0]["coverages"][0]["coverage_limit"])
+
+    def test_defaults(self):
+        """Missing optional arguments fall back to the defaults."""
+        args = {key: self.ARGS[key] for key in ("business_type", "coverage_type", "coverage_limit", "location")}
+        line = McpQuoteGenerator._build_quote_request(args)["quote"]["lines"][0]
+        self.assertEqual(line["deductible"], DEFAULT_DEDUCTIBLE)
+
+
+class FakeMcpServer:
+    """
+    Fake MCP server, counting the server processes the MultiServerMCPClient sessions start and stop.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.stopped = 0
+        self.fail_connect = False
+        self.fail_calls = False
+
+    def client(self, connections):
+        """Stand-in for the MultiServerMCPClient constructor."""
+        return FakeMcpClient(self, connections)
+
+    async def load_mcp_tools(self, _session):
+        """Stand-in for load_mcp_tools."""
+        return [FakeQuoteTool(self)]
+
+    def modules(self):
+        """The langchain-mcp-adapters modules imported by McpSession, backed by this server."""
+        package = types.ModuleType("langchain_mcp_adapters")
+        client_module = types.ModuleType("langchain_mcp_adapters.client")
+        client_module.MultiServerMCPClient = self.client
+        tools_module = types.ModuleType("langchain_mcp_adapters.tools")
+        tools_module.load_mcp_tools = self.load_mcp_tools
+        package.client = client_module
+        package.tools = tools_module
+        return {
+            "langchain_mcp_adapters": package,
+            "langchain_mcp_adapters.client": client_module,
+            "langchain_mcp_adapters.tools": tools_module,
+        }
+
+
+class FakeMcpClient:  # pylint: disable=too-few-public-methods
+    """
+    Fake MultiServerMCPClient whose sessions run on a FakeMcpServer.
+    """
+
+    def __init__(self, server: FakeMcpServer, connections):
+        self.server = server
+        self.connections = connections
+
+    @contextlib.asynccontextmanager
+    async def session(self, server_name):
+        """Start a server process for the session, and stop it when the session is closed."""
+        if self.server.fail_connect:
+            raise ConnectionError("node not found")
+        self.server.started += 1
+        try:
+            yield self.connections[server_name]
+        finally:
+            self.server.stopped += 1
+
+
+class FakeQuoteTool:  # pylint: disable=too-few-public-methods
+    """
+    Fake quote creation tool, failing while its server's fail_calls is set.
+    """
+
+    name = "create_quote"
+
+    def __init__(self, server: FakeMcpServer):
+        self.server = server
+
+    async def ainvoke(self, quote_request):
+        """Return the policy limit of the quote request, or fail like a dead server process."""
+        if self.server.fail_calls:
+            raise RuntimeError("server process exited")
+        return {"policy_limit": quote_request["quote"]["lines"][0]["policy_limit"]}
+
+
+class TestMcpSession(TestCase):
+    """
+    Unit tests for the MCP sessions shared by McpQuoteGenerator calls.
+    """
+
+    ARGS = {
+        "business_type": "Restaurant",
+        "coverage_type": "General Liability",
+        "coverage_limit": "2000000",
+        "location": "New York",
+    }
+    QUOTE = "{'policy_limit': 2000000}"
+
+    def setUp(self):
+        self.server = FakeMcpServer()
+        patcher = patch.dict(sys.modules, self.server.modules())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def invoke(self):
+        """Generate a quote with a new tool instance, as neuro-san does for every call."""
+        return await McpQuoteGenerator().async_invoke(self.ARGS, {})
+
+    def test_session_shared_by_calls(self):
+        """Concurrent and later calls share one server process, stopped when the event loop shuts down."""
+        async def invoke_all():
+            results = await asyncio.gather(*[self.invoke() for _ in range(3)])
+            results.append(await self.invoke())
+            return results
+
+        self.assertEqual(asyncio.run(invoke_all()), [self.QUOTE] * 4)
+        self.assertEqual(self.server.started, 1)
+        self.assertEqual(self.server.stopped, 1)
+
+    def test_failed_call_reconnects(self):
+        """A failed call closes its session, so each later call starts a new server process."""
+        async def invoke_all():
+            self.server.fail_calls = True
+            failed = [await self.invoke() for _ in range(3)]
+            # The failed sessions close without waiting for the event loop to shut down
+            await asyncio.sleep(0.05)
+            stopped = self.server.stopped
+            self.server.fail_calls = False
+            return failed, stopped, await self.invoke()
+
+        failed, stopped, result = asyncio.run(invoke_all())
+        for message in failed:
+            self.assertIn("server process exited", message)
+        self.assertEqual(stopped, 3)
+        self.assertEqual(result, self.QUOTE)
+        self.assertEqual(self.server.started, 4)
+
+    def test_failed_connection_retried(self):
+        """A server that could not be started is started again on the next call."""
+        async def invoke_all():
+            self.server.fail_connect = True
+            failed = await self.invoke()
+            self.server.fail_connect = False
+            return failed, await self.invoke()
+
+        failed, result = asyncio.run(invoke_all())
+        self.assertIn("node not found", failed)
+        self.assertEqual(result, self.QUOTE)
+        self.assertEqual(self.server.started, 1)
+
+    def test_idle_session_closes(self):
+        """A session that has not been used for the idle timeout stops its server process."""
+        async def invoke_all():
+            await self.invoke()
+            await asyncio.sleep(0.2)
+            stopped = self.server.stopped
+            return stopped, await self.invoke()
+
+        with patch.object(mcp_quote_generator, "MCP_SESSION_IDLE_TIMEOUT_SECONDS", 0.05):
+            stopped, result = asyncio.run(invoke_all())
+        self.assertEqual(stopped, 1)
+        self.assertEqual(result, self.QUOTE)
+        self.assertEqual(self.server.started, 2)
+
+    def test_busy_session_stays_open(self):
+        """A session is not closed as idle while a call is still using it."""
+        async def invoke_slowly():
+            session = mcp_quote_generator._get_mcp_session("index.js")
+            session.acquire()
+            await asyncio.sleep(0.2)
+            stopped = self.server.stopped
+            session.release()
+            return stopped, session.usable
+
+        with patch.object(mcp_quote_generator, "MCP_SESSION_IDLE_TIMEOUT_SECONDS", 0.05):
+            stopped, usable = asyncio.run(invoke_slowly())
+        self.assertEqual(stopped, 0)
+        self.assertTrue(usable)
@@ -0,0 +1,381 @@
+# Copyright © 2025 Cognizant Technology Solutions Corp, www.cognizant.com.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# END COPYRIGHT
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+import weakref
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from coded_tools import text_file_info_provider
+from coded_tools.text_file_info_provider import CHUNK_OVERLAP
+from coded_tools.text_file_info_provider import CHUNK_SEPARATORS
+from coded_tools.text_file_info_provider import CHUNK_SIZE
+from coded_tools.text_file_info_provider import VECTOR_SIZE
+from coded_tools.text_file_info_provider import ChunkIndex
+from coded_tools.text_file_info_provider import TextFileInfoProvider
+
+NUM_CHUNKS = 200
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "data", "excess_specialty_lines_info.txt")
+
+
+class TestChunkIndex(TestCase):
+    """
+    Unit tests for the ChunkIndex vector store of the TextFileInfoProvider CodedTool.
+    """
+
+    def setUp(self):
+        """Build random chunk embeddings and queries whose top matches are clearly separated."""
+        rng = np.random.default_rng(42)
+        self.vectors = ChunkIndex.normalize(rng.normal(size=(NUM_CHUNKS, VECTOR_SIZE)))
+        self.documents = [Document(page_content=str(i), metadata={"keywords": []}) for i in range(NUM_CHUNKS)]
+
+        # Each query is a weighted mix of 5 chunks, so the top 5 have large score gaps
+        self.queries = []
+        for _ in range(5):
+            rows = rng.choice(NUM_CHUNKS, size=5, replace=False)
+            weights = np.array([1.0, 0.8, 0.6, 0.4, 0.2])[:, None]
+            query = (weights * self.vectors[rows]).sum(axis=0) + 0.01 * rng.normal(size=VECTOR_SIZE)
+            self.queries.append(query)
+
+    def exact_top_k(self, query: np.ndarray, k: int):
+        """Rank the chunks with an exact float matrix-vector product."""
+        scores = self.vectors @ ChunkIndex.normalize(query)
+        return [str(i) for i in np.argsort(-scores)[:k]]
+
+    def assert_matches_exact(self, chunk_index: ChunkIndex, k: int = 5):
+        """Assert the chunk index returns the exact top k for every query."""
+        for query in self.queries:
+            results = chunk_index.search(query.tolist(), k)
+            self.assertEqual([doc.page_content for doc in results], self.exact_top_k(query, k))
+
+    def test_float32_search_matches_exact(self):
+        """A small chunk index keeps and scans the float32 embeddings."""
+        chunk_index = ChunkIndex(self.documents, self.vectors)
+        self.assertIsNotNone(chunk_index.matrix)
+        self.assertIsNone(chunk_index.quantized)
+        self.assert_matches_exact(chunk_index)
+
+    def test_int8_search_matches_exact(self):
+        """The NumPy int8 scan returns the same top k as the exact float search."""
+        # A kernel that is not compiled yet is not used
+        with patch.object(text_file_info_provider, "_SCORES_KERNEL_READY", threading.Event()), \
+                patch.object(text_file_info_provider, "INT8_MIN_CHUNKS", 1):
+            chunk_index = ChunkIndex(self.documents, self.vectors)
+            self.assertIsNone(chunk_index.matrix)
+            self.assertIsNotNone(chunk_index.quantized)
+            self.assert_matches_exact(chunk_index)
+
+    def test_numba_search_matches_exact(self):
+        """The numba int8 kernel returns the same top k as the exact float search."""
+        if text_file_info_provider.numba is None:
+            self.skipTest("numba is not installed")
+        # The kernel compiles in the background after import
+        self.assertTrue(text_file_info_provider._SCORES_KERNEL_READY.wait(timeout=120))
+        with patch.object(text_file_info_provider, "INT8_MIN_CHUNKS", 1):
+            chunk_index = ChunkIndex(self.documents, self.vectors)
+            self.assert_matches_exact(chunk_index)
+
+    def test_concurrent_numba_search(self):
+        """The numba int8 kernel can be called from several threads at once."""
+        if text_file_info_provider.numba is None:
+            self.skipTest("numba is not installed")
+        self.assertTrue(text_file_info_provider._SCORES_KERNEL_READY.wait(timeout=120))
+        with patch.object(text_file_info_provider, "INT8_MIN_CHUNKS", 1):
+            chunk_index = ChunkIndex(self.documents, self.vectors)
+        expected = [self.exact_top_k(query, 5) for query in self.queries]
+        failures = []
+
+        def search_all():
+            for _ in range(20):
+                for query, top in zip(self.queries, expected):
+                    if [doc.page_content for doc in chunk_index.search(query.tolist(), 5)] != top:
+                        failures.append(top)
+
+        threads = [threading.Thread(target=search_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+    def test_hnsw_search_matches_exact(self):
+        """The faiss HNSW index returns the same top k as the exact float search."""
+        if text_file_info_provider.faiss is None:
+            self.skipTest("faiss is not installed")
+        with patch.object(text_file_info_provider, "HNSW_MIN_CHUNKS", 1), \
+                tempfile.TemporaryDirectory() as cache_dir:
+            chunk_index = ChunkIndex(self.documents, self.vectors, os.path.join(cache_dir, "index.faiss"))
+            self.assertIsNotNone(chunk_index.hnsw_index)
+            self.assert_matches_exact(chunk_index)
+
+    def test_no_hnsw_without_path(self):
+        """An index that is not persisted is scanned exhaustively, however many chunks it has."""
+        with patch.object(text_file_info_provider, "HNSW_MIN_CHUNKS", 1):
+            chunk_index = ChunkIndex(self.documents, self.vectors)
+        self.assertIsNone(chunk_index.hnsw_index)
+        self.assert_matches_exact(chunk_index)
+
+    def test_zero_vector_query(self):
+        """A zero query vector still returns k chunks, without dividing by zero."""
+        chunk_index = ChunkIndex(self.documents, self.vectors)
+        with np.errstate(all="raise"):
+            results = chunk_index.search([0.0] * VECTOR_SIZE, 3)
+        self.assertEqual(len(results), 3)
+
+    def test_zero_vector_chunk(self):
+        """A zero chunk vector normalizes to zeros instead of NaNs."""
+        vectors = ChunkIndex.normalize(np.zeros((2, VECTOR_SIZE)))
+        self.assertFalse(np.isnan(vectors).any())
+
+    def test_non_positive_k(self):
+        """Searching for zero or fewer chunks returns nothing."""
+        chunk_index = ChunkIndex(self.documents, self.vectors)
+        self.assertEqual(chunk_index.search(self.queries[0].tolist(), 0), [])
+        self.assertEqual(chunk_index.search(self.queries[0].tolist(), -1), [])
+
+    def test_k_larger_than_chunk_count(self):
+        """Searching for more chunks than indexed returns every chunk once, best first."""
+        documents = self.documents[:10]
+        vectors = self.vectors[:10]
+        chunk_index = ChunkIndex(documents, vectors)
+        query = vectors[3] + 0.5 * vectors[7]
+        results = [doc.page_content for doc in chunk_index.search(query.tolist(), 50)]
+        self.assertEqual(sorted(results, key=int), [str(i) for i in range(10)])
+        self.assertEqual(results[:2], ["3", "7"])
+
+    def test_keyword_search(self):
+        """Chunks are found by their keyword metadata, in document order."""
+        documents = [
+            Document(page_content=str(i), metadata={"keywords": ["programs"] if i % 2 else ["crime"]})
+            for i in range(6)
+        ]
+        chunk_index = ChunkIndex(documents, self.vectors[:6])
+        self.assertEqual([doc.page_content for doc in chunk_index.keyword_search("programs", 2)], ["1", "3"])
+        self.assertEqual(chunk_index.keyword_search("umbrella", 2), [])
+
+
+class TestExtractKeywords(TestCase):
+    """
+    Unit tests for the keyword tagging of the TextFileInfoProvider CodedTool.
+    """
+
+    def setUp(self):
+        with open(DATA_FILE, "r", encoding="utf-8") as file:
+            # Overlapping keywords, in mixed case
+            self.text = file.read() + "\nCommercial PROPERTY Damage and General Liability for Contractors"
+
+    def extract_substring_keywords(self):
+        """Extract keywords with the plain substring scan."""
+        with patch.object(text_file_info_provider, "_KEYWORD_DATABASE", None), \
+                patch.object(text_file_info_provider, "_KEYWORD_AUTOMATON", None):
+            return TextFileInfoProvider._extract_keywords(self.text)
+
+    def test_substring_keywords(self):
+        """The substring scan reports overlapping keywords."""
+        keywords = self.extract_substring_keywords()
+        for keyword in ["commercial property", "property damage", "general liability", "liability"]:
+            self.assertIn(keyword, keywords)
+
+    def test_aho_corasick_matches_substring(self):
+        """The Aho-Corasick automaton finds the same keywords, in the same order, as the substring scan."""
+        if text_file_info_provider._KEYWORD_AUTOMATON is None:
+            self.skipTest("pyahocorasick is not installed")
+        with patch.object(text_file_info_provider, "_KEYWORD_DATABASE", None):
+            keywords = TextFileInfoProvider._extract_keywords(self.text)
+        self.assertEqual(keywords, self.extract_substring_keywords())
+
+    def test_cache_key_covers_keywords(self):
+        """Changing the keyword list invalidates the cached chunks and their keyword tags."""
+        cache_key = TextFileInfoProvider._get_cache_key(self.text)
+        keywords = text_file_info_provider.INSURANCE_KEYWORDS + ["flood"]
+        with patch.object(text_file_info_provider, "INSURANCE_KEYWORDS", keywords):
+            self.assertNotEqual(TextFileInfoProvider._get_cache_key(self.text), cache_key)
+
+    def test_hyperscan_matches_substring(self):
+        """The Hyperscan database finds the same keywords, in the same order, as the substring scan."""
+        if text_file_info_provider._KEYWORD_DATABASE is None:
+            self.skipTest("hyperscan is not installed")
+        keywords = TextFileInfoProvider._extract_keywords(self.text)
+        self.assertEqual(keywords, self.extract_substring_keywords())
+
+
+class TestEmbeddingsCache(TestCase):
+    """
+    Unit tests for the on-disk cache of embedded chunks of the TextFileInfoProvider CodedTool.
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = os.path.join(temp_dir.name, "cache")
+        patcher = patch.object(text_file_info_provider, "EMBEDDINGS_CACHE_DIR", self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.texts = ["umbrella", "crime"]
+        self.metadatas = [{"keywords": ["umbrella"]}, {"keywords": ["crime"]}]
+        self.vectors = ChunkIndex.normalize(np.random.default_rng(0).normal(size=(2, VECTOR_SIZE)))
+
+    def test_round_trip(self):
+        """Saved chunks load back unchanged, from a directory private to the current user."""
+        TextFileInfoProvider._save_cached_embeddings("key", self.texts, self.metadatas, self.vectors)
+        texts, metadatas, vectors = TextFileInfoProvider._load_cached_embeddings("key")
+        self.assertEqual(texts, self.texts)
+        self.assertEqual(metadatas, self.metadatas)
+        np.testing.assert_array_equal(vectors, self.vectors.astype(np.float32))
+        if os.name == "posix":
+            self.assertEqual(os.stat(self.cache_dir).st_mode & 0o777, 0o700)
+
+    def test_foreign_entry_ignored(self):
+        """Cache files owned by another user are ignored."""
+        if not hasattr(os, "getuid"):
+            self.skipTest("no uids on this platform")
+        TextFileInfoProvider._save_cached_embeddings("key", self.texts, self.metadatas, self.vectors)
+        with patch.object(os, "getuid", return_value=os.getuid() + 1):
+            self.assertIsNone(TextFileInfoProvider._load_cached_embeddings("key"))
+
+    def test_malformed_entry_is_a_miss(self):
+        """Valid JSON of the wrong shape is a cache miss instead of an error."""
+        TextFileInfoProvider._save_cached_embeddings("key", self.texts, self.metadatas, self.vectors)
+        chunks_path = os.path.join(self.cache_dir, "key.json")
+        for chunks in ([], {"texts": 3, "metadatas": []}, {"texts": self.texts}, {"texts": ["a"], "metadatas": [{}]}):
+            with open(chunks_path, "w", encoding="utf-8") as file:
+                json.dump(chunks, file)
+            self.assertIsNone(TextFileInfoProvider._load_cached_embeddings("key"))
+
+
+class TestFormatRagResults(TestCase):
+    """
+    Unit tests for the formatting of the retrieved chunks by the TextFileInfoProvider CodedTool.
+    """
+
+    def setUp(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test"}):
+            self.provider = TextFileInfoProvider()
+        self.results = [Document(page_content=f" {chr(ord('a') + i)} " * 150) for i in range(4)]
+
+    def format(self, max_chars: int):
+        """Format the results and split the output into its body and its footer."""
+        output = self.provider._format_rag_results(self.results, "crime", max_chars)
+        body, footer = output.rsplit("\n\n", 1)
+        return body, footer
+
+    def assert_footer_matches_sections(self, body: str, footer: str):
+        """Assert the footer reports as many sections as the body contains."""
+        match = re.fullmatch(r"\[Retrieved (\d+) relevant sections from 4 total matches\]", footer)
+        self.assertIsNotNone(match)
+        self.assertEqual(int(match.group(1)), body.count("--- Section "))
+
+    def test_all_sections_fit(self):
+        """Every section is emitted in full when there is room for all of them."""
+        body, footer = self.format(10000)
+        self.assertEqual(body.count("--- Section "), 4)
+        self.assertNotIn("...", body)
+        self.assert_footer_matches_sections(body, footer)
+
+    def test_truncated_section(self):
+        """The section that does not fit is truncated, keeping the body within max_chars."""
+        for max_chars in range(200, 1400, 37):
+            body, footer = self.format(max_chars)
+            self.assertLessEqual(len(body), max_chars)
+            self.assert_footer_matches_sections(body, footer)
+
+    def test_no_results(self):
+        """No results gives a fixed message."""
+        self.assertEqual(self.provider._format_rag_results([], "crime", 1000), "No relevant information found.")
+
+
+class FakeEmbeddings:
+    """
+    Deterministic embeddings that count the document embedding requests, so no API calls are made.
+    """
+
+    def __init__(self):
+        self.fake = DeterministicFakeEmbedding(size=VECTOR_SIZE)
+        self.document_calls = 0
+
+    async def aembed_documents(self, texts):
+        """Embed document chunks, counting the request."""
+        self.document_calls += 1
+        return self.fake.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        """Embed a search query."""
+        return self.fake.embed_query(text)
+
+
+class TestDefaultVectorStore(TestCase):
+    """
+    Unit tests for the vector store of the default data file, shared by TextFileInfoProvider instances.
+    """
+
+    def setUp(self):
+        self.embeddings = FakeEmbeddings()
+        cache_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cache_dir.cleanup)
+
+        # Fake embeddings, a character splitter (tiktoken downloads its encoding), no cached embeddings
+        # and no vector store left over from another test
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=CHUNK_SEPARATORS
+        )
+        patches = [
+            patch.object(text_file_info_provider, "_get_embeddings", return_value=self.embeddings),
+            patch.object(TextFileInfoProvider, "_splitter", splitter),
+            patch.object(text_file_info_provider, "EMBEDDINGS_CACHE_DIR", cache_dir.name),
+            patch.object(text_file_info_provider, "_default_vector_store", None),
+            patch.object(text_file_info_provider, "_default_vector_store_builds", weakref.WeakKeyDictionary()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_built_once_for_all_instances(self):
+        """Concurrent and later calls on new instances share a single build of the vector store."""
+        async def invoke_all():
+            args = {"query": "umbrella coverage for contractors"}
+            first = await asyncio.gather(*[TextFileInfoProvider().async_invoke(args, {}) for _ in range(3)])
+            later = await TextFileInfoProvider().async_invoke(args, {})
+            return first + [later]
+
+        results = asyncio.run(invoke_all())
+        self.assertEqual(self.embeddings.document_calls, 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertTrue(results[0].startswith("Found relevant information"))
+        self.assertIsNotNone(text_file_info_provider._default_vector_store)
+
+    def test_no_warmup_for_custom_file(self):
+        """Constructing the tool or querying a custom file does not build the default vector store."""
+        async def invoke_custom():
+            provider = TextFileInfoProvider()
+            self.assertEqual(len(text_file_info_provider._default_vector_store_builds), 0)
+            return await provider.async_invoke({"file_path": DATA_FILE, "query": "crime"}, {})
+
+        result = asyncio.run(invoke_custom())
+        self.assertTrue(result.startswith("Found relevant information"))
+        self.assertEqual(self.embeddings.document_calls, 1)
+        self.assertIsNone(text_file_info_provider._default_vector_store)
+        self.assertEqual(len(text_file_info_provider._default_vector_store_builds), 0)